@@ -1,5 +1,11 @@
-from dataclasses import dataclass
-import random
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import multiprocessing, os
+import numpy as np
+import numpy.typing as npt
+from bandits_nb import HAVE_NUMBA, _run_thompson
 
 @dataclass
 class Drop:
@@ -10,6 +16,32 @@ class Drop:
     sold: int = 0
     redemptions: int = 0
 
+@dataclass
+class DropArrays:
+    base_p: np.ndarray
+    stock: np.ndarray
+    sold: np.ndarray
+    redemptions: np.ndarray
+    duration_s: np.ndarray
+    names: List[str]
+    def __len__(self) -> int:
+        return len(self.names)
+    @classmethod
+    def from_drops(cls, drops: List[Drop]) -> DropArrays:
+        return cls(base_p=np.array([d.base_p for d in drops], dtype=float),
+                   stock=np.array([d.stock for d in drops], dtype=np.int64),
+                   sold=np.array([d.sold for d in drops], dtype=np.int64),
+                   redemptions=np.array([d.redemptions for d in drops], dtype=np.int64),
+                   duration_s=np.array([d.duration_s for d in drops], dtype=np.int64),
+                   names=[d.name for d in drops])
+    def copy(self) -> DropArrays:
+        return replace(self, base_p=self.base_p.copy(), stock=self.stock.copy(), sold=self.sold.copy(),
+                       redemptions=self.redemptions.copy(), duration_s=self.duration_s.copy(),
+                       names=list(self.names))
+    def write_back(self, drops: List[Drop]) -> None:
+        for i, d in enumerate(drops):
+            d.stock, d.sold, d.redemptions = int(self.stock[i]), int(self.sold[i]), int(self.redemptions[i])
+
 def urgency_multiplier(t_remaining: int, total: int, k: float = 1.25) -> float:
     if total <= 0:
         return 1.0
@@ -17,73 +49,215 @@ def urgency_multiplier(t_remaining: int, total: int, k: float = 1.25) -> float:
     mult = (1.0 + k * (1.0 - x))
     return max(0.2, min(2.0, mult))
 
+def urgency_table(duration_s: int, k: float = 1.25) -> np.ndarray:
+    # urgency_multiplier(t, duration_s) for every t in [0, duration_s]
+    if duration_s <= 0:
+        return np.ones(1)
+    x = np.clip(np.arange(duration_s + 1) / duration_s, 0.0, 1.0)
+    return np.clip(1.0 + k * (1.0 - x), 0.2, 2.0)
+
+def _urgency_tables(durations: np.ndarray) -> np.ndarray:
+    # one row per arm, indexed by t_remaining; shorter rows are padded
+    table = np.ones((len(durations), max(0, int(durations.max(initial=0))) + 1))
+    for a, d in enumerate(durations):
+        row = urgency_table(int(d))
+        table[a, :len(row)] = row
+    return table
+
 def observed_conversion(p_base: float, t_remaining: int, total: int) -> float:
     return max(0.0, min(1.0, p_base * urgency_multiplier(t_remaining, total)))
 
+_THOMPSON_KERNELS: Dict[int, Callable[..., int]] = {}
+
+def _thompson_kernel(k: int) -> Callable[..., int]:
+    # Thompson pick for exactly k arms, generated once per k with the per-arm
+    # draw and argmax unrolled: kern(alpha, beta, available, draw) -> arm
+    kern = _THOMPSON_KERNELS.get(k)
+    if kern is None:
+        src = ["def kern(alpha, beta, available, draw):"]
+        src += [f"    s{i} = draw(alpha[{i}], beta[{i}]) if available[{i}] else -1.0" for i in range(k)]
+        src += ["    best, best_val = 0, s0"]
+        src += [f"    if s{i} > best_val: best, best_val = {i}, s{i}" for i in range(1, k)]
+        src += ["    return best"]
+        ns: Dict[str, Any] = {}
+        exec("\n".join(src), ns)
+        kern = _THOMPSON_KERNELS[k] = ns["kern"]
+    return kern
+
 class ThompsonBeta:
-    def __init__(self, alpha, beta):
-        self.alpha, self.beta = alpha, beta
+    # Beta-Bernoulli posterior per arm; picks go through the unrolled kernel
+    # for this arm count, which simulate_run also calls once per user. The seed
+    # (or a Generator to share) is required, like random_policy's rng, so
+    # every agent is reproducible.
+    def __init__(self, alpha: npt.ArrayLike, beta: npt.ArrayLike, seed: Union[int, np.random.Generator]):
+        self.alpha = np.asarray(alpha, dtype=float)
+        self.beta = np.asarray(beta, dtype=float)
+        self.rng = np.random.default_rng(seed)
+        self._pick = _thompson_kernel(len(self.alpha))
     @classmethod
-    def with_k(cls, k: int, a0: float = 1.0, b0: float = 1.0):
-        return cls([a0]*k, [b0]*k)
-    def sample_index(self, available_idx):
-        best_idx, best_val = None, -1
-        for i in available_idx:
-            val = random.betavariate(self.alpha[i], self.beta[i])
-            if val > best_val:
-                best_val, best_idx = val, i
-        return best_idx
-    def update(self, i: int, success: int):
-        if success: self.alpha[i] += 1.0
-        else: self.beta[i] += 1.0
-
-def random_policy(k: int) -> int:
-    return random.randrange(k)
-
-def make_default_drops(k: int = 3, stock: int = 120, duration_s: int = 900):
+    def with_k(cls, k: int, *, seed: Union[int, np.random.Generator],
+               a0: float = 1.0, b0: float = 1.0) -> ThompsonBeta:
+        return cls(np.full(k, a0), np.full(k, b0), seed=seed)
+    def sample_index(self, available_mask: np.ndarray, rng: Optional[np.random.Generator] = None) -> int:
+        # one Beta draw per available arm, argmax over the draws. This used to
+        # take a list of indices; reject those rather than misread them.
+        mask = np.asarray(available_mask)
+        if mask.dtype != np.bool_ or mask.shape != self.alpha.shape:
+            raise ValueError("available_mask must be a boolean array with one entry per arm")
+        return self._pick(self.alpha, self.beta, mask.tolist(), (self.rng if rng is None else rng).beta)
+    def update(self, i: int, success: int) -> None:
+        self.alpha[i] += success
+        self.beta[i] += 1 - success
+
+def random_policy(k: int, rng: np.random.Generator, size: Optional[int] = None) -> Any:
+    # one arm index, or an array of `size` independent picks
+    if size is None:
+        return int(rng.integers(0, k))
+    return rng.integers(0, k, size)
+
+def make_default_drops(k: int = 3, stock: int = 120, duration_s: int = 900) -> DropArrays:
     base_defaults = [0.06, 0.10, 0.14, 0.08, 0.12, 0.05]
     if k > len(base_defaults):
         base_ps = (base_defaults * ((k + len(base_defaults) - 1)//len(base_defaults)))[:k]
     else:
         base_ps = base_defaults[:k]
-    return [Drop(name=f"Drop {i+1}", base_p=base_ps[i], stock=stock, duration_s=duration_s) for i in range(k)]
-
-def simulate_run(drops, users=500, horizon_s=900, policy="random", seed=42):
-    random.seed(seed)
-    agent = ThompsonBeta.with_k(len(drops)) if policy == "thompson" else None
-    arrivals = sorted([random.randrange(horizon_s) for _ in range(users)])
-    views = tokens = redemptions = 0
-    for t in arrivals:
-        available = [i for i,d in enumerate(drops) if d.stock > 0]
-        if not available: continue
-        if policy == "random":
-            i = available[random_policy(len(available))]
-        elif policy == "thompson":
-            i = agent.sample_index(available)
-        d = drops[i]
+    return DropArrays(base_p=np.array(base_ps, dtype=float),
+                      stock=np.full(k, stock, dtype=np.int64),
+                      sold=np.zeros(k, dtype=np.int64),
+                      redemptions=np.zeros(k, dtype=np.int64),
+                      duration_s=np.full(k, duration_s, dtype=np.int64),
+                      names=[f"Drop {i+1}" for i in range(k)])
+
+def _simulate_random(drops: DropArrays, users: int, horizon_s: int, seed: int) -> int:
+    # Between two stockouts the available set is fixed, so every user of that
+    # stretch is independent: draw them all at once, then cut the batch at the
+    # first arm that runs out. At most K+1 batches per run.
+    rng = np.random.default_rng(seed)
+    arrivals = np.sort(rng.integers(0, horizon_s, users))
+    base_p, durations, stock = drops.base_p, drops.duration_s, drops.stock
+    urgency = _urgency_tables(durations)
+    views = start = 0
+    while start < users:
+        idxs = np.flatnonzero(stock > 0)
+        if len(idxs) == 0: break
+        t = arrivals[start:]
+        choices = idxs[random_policy(len(idxs), rng, size=len(t))]
+        t_remaining = np.maximum(0, durations[choices] - t)
+        p_obs = np.minimum(1.0, base_p[choices] * urgency[choices, t_remaining])
+        hits = rng.random(len(t)) < p_obs
+        end = len(t)
+        for i in idxs:
+            pos = np.flatnonzero(hits & (choices == i))
+            if len(pos) >= stock[i]:
+                end = min(end, int(pos[stock[i] - 1]) + 1)
+        sold = np.zeros(len(drops), dtype=np.int64)
+        np.add.at(sold, choices[:end][hits[:end]], 1)
+        stock -= sold
+        views += end
+        start += end
+    return views
+
+def _simulate_thompson(drops: DropArrays, users: int, horizon_s: int, seed: int) -> int:
+    # private Generator shared by arrivals, token draws and Beta draws: no
+    # global state with other runs/threads. Token draws are known upfront;
+    # Beta draws stay online since they depend on the posterior. Both paths
+    # consume the stream in the same order, so numba does not change results.
+    rng = np.random.default_rng(seed)
+    arrivals = np.sort(rng.integers(0, horizon_s, users))
+    uniforms = rng.random(users)
+    # the posterior lives in one ThompsonBeta for both paths; the Numba kernel
+    # mirrors agent._pick/update in compiled form (checked in test_bandits.py)
+    agent = ThompsonBeta.with_k(len(drops), seed=rng)
+    if HAVE_NUMBA:
+        return _run_thompson(drops.base_p, drops.duration_s, _urgency_tables(drops.duration_s), drops.stock,
+                             arrivals, uniforms, agent.alpha, agent.beta, agent.rng)
+    _pick, _update, _draw = agent._pick, agent.update, agent.rng.beta
+    alpha, beta = agent.alpha, agent.beta
+    # per-arm drop state as plain lists: scalar indexing is cheaper than on arrays
+    base_p, durations = drops.base_p.tolist(), drops.duration_s.tolist()
+    urgency = _urgency_tables(drops.duration_s).tolist()
+    stock = drops.stock.tolist()
+    _uniforms = uniforms.tolist()
+    # the mask only changes on a stockout (at most K times per run)
+    available = [n > 0 for n in stock]
+    n_available = sum(available)
+    views = 0
+    for user_idx, t in enumerate(arrivals.tolist()):
+        if not n_available: break
+        i = _pick(alpha, beta, available, _draw)
         views += 1
-        t_remaining = max(0, d.duration_s - t)
-        p_obs = observed_conversion(d.base_p, t_remaining, d.duration_s)
-        token = 1 if random.random() < p_obs else 0
+        p_obs = min(1.0, base_p[i] * urgency[i][max(0, durations[i] - t)])
+        token = 1 if _uniforms[user_idx] < p_obs else 0
         if token:
-            tokens += 1
-            d.stock -= 1
-            d.sold += 1
-            redemptions += 1
-            d.redemptions += 1
-            if policy == "thompson": agent.update(i, 1)
-        else:
-            if policy == "thompson": agent.update(i, 0)
+            stock[i] -= 1
+            if stock[i] == 0:
+                available[i] = False
+                n_available -= 1
+        _update(i, token)
+    drops.stock[:] = stock
+    return views
+
+def simulate_run(drops: Union[DropArrays, List[Drop]], users: int = 500, horizon_s: int = 900,
+                 policy: str = "random", seed: int = 42) -> Dict[str, float]:
+    # list[Drop] is still accepted: run on arrays, then mirror counters back
+    arrays = drops if isinstance(drops, DropArrays) else DropArrays.from_drops(drops)
+    # the kernels only count views and decrement stock; every token is a sale
+    # (and a redemption in Run 1), so the rest follows from the stock delta
+    stock0 = arrays.stock.copy()
+    if policy == "random":
+        views = _simulate_random(arrays, users, horizon_s, seed)
+    elif policy == "thompson":
+        views = _simulate_thompson(arrays, users, horizon_s, seed)
+    else:
+        raise ValueError("Unknown policy")
+    sold = stock0 - arrays.stock
+    arrays.sold += sold
+    arrays.redemptions += sold
+    if not isinstance(drops, DropArrays):
+        arrays.write_back(drops)
+    tokens = redemptions = int(sold.sum())
     ctr = (tokens / views) if views else 0.0
     conv = (redemptions / tokens) if tokens else 0.0
-    util_stock = sum(d.sold for d in drops) / max(1, sum(d.stock + d.sold for d in drops))
+    total_sold = int(arrays.sold.sum())
+    util_stock = total_sold / max(1, total_sold + int(arrays.stock.sum()))
     return {"views": views, "tokens": tokens, "redemptions": redemptions,
             "CTR": ctr, "conversion_given_token": conv, "utilization_stock": util_stock}
 
-def compare_policies(users: int, horizon_s: int, drops_k: int, seed: int):
+def compare_policies(users: int, horizon_s: int, drops_k: int, seed: int) -> Dict[str, Dict[str, float]]:
     r_drops = make_default_drops(k=drops_k, duration_s=horizon_s)
-    t_drops = make_default_drops(k=drops_k, duration_s=horizon_s)
+    t_drops = r_drops.copy()
     return {
         "random": simulate_run(r_drops, users=users, horizon_s=horizon_s, policy="random", seed=seed),
         "thompson": simulate_run(t_drops, users=users, horizon_s=horizon_s, policy="thompson", seed=seed),
     }
+
+def _run_one(args: Tuple[int, int, int, int]) -> Tuple[int, Dict[str, Dict[str, float]]]:
+    users, horizon_s, drops_k, seed = args
+    return seed, compare_policies(users, horizon_s, drops_k, seed)
+
+# Process-pool break-even, measured on the default 3-drop setup: a forkserver
+# pool whose workers import numpy (and numba) takes ~0.75 s to start, and a
+# seed costs ~0.1 us per simulated user with numba, ~0.2 us without. With P
+# workers the pool wins only when users*seeds*cost*(1 - 1/P) > startup, i.e.
+# above ~10M simulated users on 4 cores. The Streamlit sliders top out at
+# 50 seeds x 10000 users, so the app always runs serially.
+_POOL_STARTUP_S = 0.75
+_USER_COST_S = 0.1e-6 if HAVE_NUMBA else 0.2e-6
+
+def _pool_workers(users: int, n_tasks: int, max_workers: Optional[int]) -> int:
+    # 0 means run serially: a pool would not pay for its own startup
+    workers = min(max_workers or os.cpu_count() or 1, n_tasks)
+    if workers < 2 or users * n_tasks * _USER_COST_S * (1 - 1 / workers) <= _POOL_STARTUP_S:
+        return 0
+    return workers
+
+def compare_policies_seeds(users: int, horizon_s: int, drops_k: int, seeds: Iterable[int],
+                           max_workers: Optional[int] = None) -> List[Tuple[int, Dict[str, Dict[str, float]]]]:
+    tasks = [(users, horizon_s, drops_k, s) for s in seeds]
+    workers = _pool_workers(users, len(tasks), max_workers)
+    if not workers:
+        return [_run_one(t) for t in tasks]
+    # one seed per task; never fork: callers such as Streamlit are multi-threaded
+    ctx = multiprocessing.get_context("spawn" if os.name == "nt" else "forkserver")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+        return list(ex.map(_run_one, tasks))
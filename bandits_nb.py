@@ -0,0 +1,38 @@
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    def njit(*args, **kwargs):  # type: ignore[no-redef]
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+@njit(cache=True)
+def _run_thompson(base_p, duration_s, urgency, stock, arrivals, uniforms, alpha, beta, rng):
+    # Thompson loop of bandits.simulate_run on plain arrays (urgency is the
+    # per-arm table from bandits._urgency_tables); stock and alpha/beta are
+    # updated in place, only views are returned. rng is the run's Generator:
+    # Beta draws follow the same order as bandits._thompson_kernel.
+    k = base_p.shape[0]
+    views = 0
+    for j in range(arrivals.shape[0]):
+        t = arrivals[j]
+        best, best_val = -1, -1.0
+        for i in range(k):
+            if stock[i] > 0:
+                val = rng.beta(alpha[i], beta[i])
+                if val > best_val:
+                    best, best_val = i, val
+        if best < 0:
+            continue
+        views += 1
+        p_obs = min(1.0, base_p[best] * urgency[best, max(0, duration_s[best] - t)])
+        if uniforms[j] < p_obs:
+            stock[best] -= 1
+            alpha[best] += 1.0
+        else:
+            beta[best] += 1.0
+    return views
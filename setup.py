@@ -0,0 +1,17 @@
+# bandits.py is compiled with mypyc when mypy is importable at build time;
+# otherwise the modules ship as plain Python. Compiled build:
+#   pip install mypy setuptools wheel numpy
+#   python setup.py build_ext --inplace              (in place, next to bandits.py)
+#   pip wheel . --no-deps --no-build-isolation -w dist/
+# The in-place extension is imported instead of bandits.py; delete the .so to
+# go back to the pure-Python module.
+from setuptools import setup
+
+try:
+    from mypyc.build import mypycify
+except ImportError:
+    build = {"py_modules": ["bandits", "bandits_nb"]}
+else:
+    build = {"py_modules": ["bandits_nb"], "ext_modules": mypycify(["bandits.py"])}
+
+setup(name="snappx-trl3-run1", install_requires=["numpy"], **build)
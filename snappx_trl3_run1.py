@@ -2,8 +2,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict
-import argparse, random, csv, sys
+import argparse, random, csv, sys, os, multiprocessing
 
 @dataclass
 class Drop:
@@ -98,6 +99,23 @@ def compare_policies(users: int, horizon_s: int, drops_k: int, seed: int):
         "thompson": simulate_run(t_drops, users=users, horizon_s=horizon_s, policy="thompson", seed=seed),
     }
 
+def _run_one(args):
+    users, horizon_s, drops_k, seed = args
+    return seed, compare_policies(users, horizon_s, drops_k, seed)
+
+# Same break-even rule as bandits.compare_policies_seeds, measured for this
+# pure-Python script: a forkserver pool starts in ~0.06 s (workers import no
+# numpy), and a seed costs >= ~1.5 us per simulated user (more for small runs).
+_POOL_STARTUP_S = 0.1
+_USER_COST_S = 1.5e-6
+
+def _pool_workers(users, n_tasks):
+    # 0 means run serially: a pool would not pay for its own startup
+    workers = min(os.cpu_count() or 1, n_tasks)
+    if workers < 2 or users * n_tasks * _USER_COST_S * (1 - 1 / workers) <= _POOL_STARTUP_S:
+        return 0
+    return workers
+
 def parse_args(argv):
     import argparse
     p = argparse.ArgumentParser(description="Snappx — TRL-3 / Run 1")
@@ -111,8 +129,15 @@ def parse_args(argv):
 def main(argv):
     args = parse_args(argv)
     rows = []
-    for seed in range(args.seeds):
-        out = compare_policies(args.users, args.horizon, args.drops, seed)
+    tasks = [(args.users, args.horizon, args.drops, s) for s in range(args.seeds)]
+    workers = _pool_workers(args.users, len(tasks))
+    if workers:
+        ctx = multiprocessing.get_context("spawn" if os.name == "nt" else "forkserver")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+            results = list(ex.map(_run_one, tasks))
+    else:
+        results = [_run_one(t) for t in tasks]
+    for seed, out in results:
         for pol, m in out.items():
             rows.append({"seed": seed, "policy": pol, **m})
 
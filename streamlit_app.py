@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
-from bandits import compare_policies
+from bandits import compare_policies_seeds
 
 st.title("Snappx — TRL-3 / Run 1 (Streamlit)")
 
@@ -16,12 +17,35 @@ with st.sidebar:
     seeds = st.slider("Seeds (medie)", 1, 50, 20, 1)
     seed0 = st.number_input("Seed di partenza", 0, 100000, 0, 1)
 
-rows = []
-for s in range(seed0, seed0 + seeds):
-    out = compare_policies(users=users, horizon_s=horizon, drops_k=drops, seed=s)
-    for pol, m in out.items():
-        rows.append({"seed": s, "policy": pol, **m})
-df = pd.DataFrame(rows)
+METRICS = {"views": int, "tokens": int, "redemptions": int,
+           "CTR": float, "conversion_given_token": float, "utilization_stock": float}
+
+@st.cache_data(max_entries=64)
+def run_batch(users, horizon, drops_k, seed0, seeds):
+    results = compare_policies_seeds(users, horizon, drops_k, range(seed0, seed0 + seeds))
+    n = sum(len(out) for _, out in results)
+    cols = {"seed": np.empty(n, dtype=int), "policy": np.empty(n, dtype=object)}
+    cols.update({k: np.empty(n, dtype=t) for k, t in METRICS.items()})
+    idx = 0
+    for s, out in results:
+        for pol, m in out.items():
+            cols["seed"][idx] = s
+            cols["policy"][idx] = pol
+            for k in METRICS:
+                cols[k][idx] = m[k]
+            idx += 1
+    return pd.DataFrame(cols)
+
+@st.cache_data(ttl=3600)
+def _load_run_csv(path):
+    return pd.read_csv(path)
+
+@st.cache_data(ttl=3600)
+def _load_png(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+df = run_batch(users, horizon, drops, seed0, seeds)
 
 st.subheader("Per-seed results (Simulazione live)")
 st.dataframe(df, use_container_width=True)
@@ -39,7 +63,7 @@ st.header("📂 Run salvato (da CSV + grafici)")
 csv_path = "outputs/streamlit_trl_3_r1/run.csv"
 
 if os.path.exists(csv_path):
-    df_saved = pd.read_csv(csv_path)
+    df_saved = _load_run_csv(csv_path)
 
     for c in ["views","tokens","redemptions","CTR"]:
         if c in df_saved.columns:
@@ -60,10 +84,10 @@ if os.path.exists(csv_path):
     plot_or = os.path.join("outputs/streamlit_trl_3_r1", "plots_overall_rate.png")
 
     if os.path.exists(plot_lc):
-        st.image(plot_lc, caption="Learning Curve", use_container_width=True)
+        st.image(_load_png(plot_lc), caption="Learning Curve", use_container_width=True)
 
     if os.path.exists(plot_or):
-        st.image(plot_or, caption="Overall CTR", use_container_width=True)
+        st.image(_load_png(plot_or), caption="Overall CTR", use_container_width=True)
 
 else:
     st.warning("Nessun file run.csv trovato in outputs/streamlit_trl_3_r1/")
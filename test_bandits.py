@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+import bandits
+
+@pytest.mark.skipif(not bandits.HAVE_NUMBA, reason="numba not installed")
+@pytest.mark.parametrize("drops_k", [2, 3, 6])
+@pytest.mark.parametrize("seed", range(4))
+def test_thompson_same_result_with_and_without_numba(monkeypatch, drops_k, seed):
+    jit = bandits.compare_policies(3000, 900, drops_k, seed)["thompson"]
+    monkeypatch.setattr(bandits, "HAVE_NUMBA", False)
+    assert bandits.compare_policies(3000, 900, drops_k, seed)["thompson"] == jit
+
+def test_thompson_kernel_is_argmax_of_available_draws():
+    alpha, beta = np.array([2.0, 1.0, 5.0]), np.array([1.0, 3.0, 1.0])
+    pick = bandits._thompson_kernel(3)(alpha, beta, [True, False, True], np.random.default_rng(11).beta)
+    rng = np.random.default_rng(11)
+    draws = {i: rng.beta(alpha[i], beta[i]) for i in (0, 2)}
+    assert pick == max(draws, key=draws.get)
+
+def test_thompson_kernel_never_picks_sold_out_arm():
+    kern, draw = bandits._thompson_kernel(4), np.random.default_rng(0).beta
+    alpha, beta = np.ones(4), np.ones(4)
+    assert {kern(alpha, beta, [False, True, False, True], draw) for _ in range(200)} == {1, 3}
+    assert {kern(alpha, beta, [False, False, True, False], draw) for _ in range(50)} == {2}
+
+def test_thompson_update_moves_posterior():
+    agent = bandits.ThompsonBeta.with_k(2, seed=0)
+    agent.update(0, 1)
+    agent.update(1, 0)
+    assert agent.alpha.tolist() == [2.0, 1.0] and agent.beta.tolist() == [1.0, 2.0]
+
+def test_sample_index_draws_from_override_rng():
+    agent = bandits.ThompsonBeta.with_k(3, seed=0)
+    agent.update(2, 1)
+    mask = np.array([True, True, True])
+    own_state = agent.rng.bit_generator.state
+    expected = bandits._thompson_kernel(3)(agent.alpha, agent.beta, [True] * 3, np.random.default_rng(5).beta)
+    assert agent.sample_index(mask, np.random.default_rng(5)) == expected
+    assert agent.rng.bit_generator.state == own_state
+    agent.sample_index(mask)
+    assert agent.rng.bit_generator.state != own_state
+
+@pytest.mark.parametrize("bad", [[0, 1], np.array([0, 1]), np.array([True, False, True])])
+def test_sample_index_rejects_index_lists_and_wrong_length(bad):
+    with pytest.raises(ValueError):
+        bandits.ThompsonBeta.with_k(2, seed=0).sample_index(bad)
+
+def test_thompson_requires_seed_and_is_reproducible():
+    with pytest.raises(TypeError):
+        bandits.ThompsonBeta.with_k(3)
+    mask = np.array([True, True, True])
+    def picks(seed):
+        agent = bandits.ThompsonBeta.with_k(3, seed=seed)
+        return [agent.sample_index(mask) for _ in range(20)]
+    assert picks(4) == picks(4)
+
+def _tight_drops(stock=5, k=3):
+    return bandits.make_default_drops(k=k, stock=stock)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_batches_respect_stock(seed):
+    drops = _tight_drops()
+    out = bandits.simulate_run(drops, users=3000, policy="random", seed=seed)
+    assert (drops.stock >= 0).all() and (drops.sold <= 5).all()
+    assert out["tokens"] == int(drops.sold.sum()) == out["redemptions"]
+    assert (drops.stock + drops.sold == 5).all()
+
+def test_random_views_stop_when_everything_sold_out():
+    drops = _tight_drops()
+    drops.base_p[:] = 5.0  # p_obs clamps to 1: every view sells one unit
+    out = bandits.simulate_run(drops, users=3000, policy="random", seed=0)
+    assert out["views"] == out["tokens"] == 15
+    assert (drops.stock == 0).all()
+
+def _random_reference(drops, users, horizon_s, seed):
+    # one user at a time, as the pre-batching loop did
+    rng = np.random.default_rng(seed)
+    urgency = bandits._urgency_tables(drops.duration_s)
+    views = 0
+    for t in np.sort(rng.integers(0, horizon_s, users)):
+        idxs = np.flatnonzero(drops.stock > 0)
+        if len(idxs) == 0: break
+        i = idxs[rng.integers(0, len(idxs))]
+        views += 1
+        p_obs = min(1.0, drops.base_p[i] * urgency[i, max(0, drops.duration_s[i] - t)])
+        if rng.random() < p_obs:
+            drops.stock[i] -= 1
+    return views
+
+def test_random_batches_match_per_user_reference_on_average():
+    batched = [bandits.simulate_run(_tight_drops(20), users=2000, policy="random", seed=s)["views"]
+               for s in range(300)]
+    reference = [_random_reference(_tight_drops(20), 2000, 900, 10_000 + s) for s in range(300)]
+    se = np.sqrt(np.var(batched) / 300 + np.var(reference) / 300)
+    assert abs(np.mean(batched) - np.mean(reference)) < 4 * se
+
+@pytest.mark.parametrize("policy", ["random", "thompson"])
+def test_simulate_run_updates_drop_list(policy):
+    drops = [bandits.Drop("a", 0.10, 30, 900, sold=2, redemptions=2), bandits.Drop("b", 0.20, 30, 900)]
+    out = bandits.simulate_run(drops, users=2000, policy=policy, seed=1)
+    sold_now = [d.sold for d in drops]
+    assert [d.stock + d.sold for d in drops] == [32, 30]
+    assert [d.redemptions for d in drops] == sold_now
+    assert sum(sold_now) - 2 == out["tokens"] > 0
+    assert all(type(d.stock) is int for d in drops)
+
+@pytest.mark.parametrize("args, expected", [
+    ((3000, 900, 3, 0), {"random": (2642, 360), "thompson": (2553, 360)}),
+    ((500, 600, 6, 1), {"random": (500, 73), "thompson": (500, 89)}),
+])
+def test_compare_policies_seed_regression(monkeypatch, args, expected):
+    # pinned (views, tokens) per policy; runs without numba, and the parity
+    # test above ties the numba path to the same numbers
+    monkeypatch.setattr(bandits, "HAVE_NUMBA", False)
+    out = bandits.compare_policies(*args)
+    assert {pol: (m["views"], m["tokens"]) for pol, m in out.items()} == expected
+    for m in out.values():
+        assert m["CTR"] == m["tokens"] / m["views"]
+
+def test_pool_only_when_it_pays_off(monkeypatch):
+    monkeypatch.setattr(bandits.os, "cpu_count", lambda: 8)
+    assert bandits._pool_workers(10_000, 50, None) == 0  # Streamlit maximum
+    assert bandits._pool_workers(400_000, 6, None) == 0
+    assert bandits._pool_workers(10_000_000, 8, None) == 8
+    assert bandits._pool_workers(10_000_000, 8, 1) == 0
+    monkeypatch.setattr(bandits.os, "cpu_count", lambda: 1)
+    assert bandits._pool_workers(10_000_000, 8, None) == 0
+
+def test_compare_policies_seeds_pool_matches_serial(monkeypatch):
+    serial = bandits.compare_policies_seeds(500, 900, 3, range(3), max_workers=1)
+    monkeypatch.setattr(bandits, "_POOL_STARTUP_S", 0.0)
+    assert bandits.compare_policies_seeds(500, 900, 3, range(3), max_workers=2) == serial